@@ -14,6 +14,21 @@ COMMAND_PREFIXES = ("/summary", "/week", "/month", "/lookup", "/undo", "/reset t
 def _now_ms() -> int:
     return int(time.time() * 1000)
 
+# The UTC day string only changes once a day; cache it until the next
+# UTC midnight so warm invocations skip the strftime/gmtime work and
+# the date still rolls over exactly on the boundary.
+_DAY_CACHE = (0.0, "")
+
+def _today_utc(ts_ms: int) -> str:
+    global _DAY_CACHE
+    now = ts_ms / 1000
+    exp, day = _DAY_CACHE
+    if now < exp and day:
+        return day
+    day = time.strftime("%Y-%m-%d", time.gmtime(now))
+    _DAY_CACHE = ((int(now) // 86400 + 1) * 86400, day)
+    return day
+
 def _parse_body(event):
     """
     Support Twilio (x-www-form-urlencoded) and JSON test posts.
@@ -83,7 +98,7 @@ def _twiml_empty():
 def lambda_handler(event, context):
     text, sender, transport, source_kind = _parse_body(event)
     ts = _now_ms()
-    dt = time.strftime("%Y-%m-%d", time.gmtime(ts/1000))
+    dt = _today_utc(ts)
 
     kind, verb, args = _classify(text)
 
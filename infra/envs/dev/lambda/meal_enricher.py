@@ -1,19 +1,35 @@
 # file: infra/envs/dev/lambda/meal_enricher.py
-import os, json, time, hashlib, logging, re, random
+import os, sys, json, time, hashlib, logging, re, random
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from decimal import Decimal
 from zoneinfo import ZoneInfo
 from datetime import datetime, timedelta, date
 import boto3
 import requests
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from boto3.dynamodb.conditions import Key, Attr
-from difflib import get_close_matches
+from boto3.dynamodb.types import TypeSerializer
+
+try:
+    import orjson  # available via the Lambda layer; stdlib json elsewhere
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson else json.loads
 
 log = logging.getLogger()
 log.setLevel(logging.INFO)
 
 # ---- AWS clients / env ----
-secrets = boto3.client("secretsmanager")
-ddb = boto3.resource("dynamodb")
+# Keep-alive + a larger pool so fan-out query paths reuse warm TLS
+# sockets instead of re-handshaking per call.
+_BOTO_CFG = Config(tcp_keepalive=True, max_pool_connections=50, retries={"mode": "adaptive"})
+secrets = boto3.client("secretsmanager", config=Config(tcp_keepalive=True))
+ddb = boto3.resource("dynamodb", config=_BOTO_CFG)
 
 MEALS_TABLE   = os.environ["MEALS_TABLE"]        # hb_meals_dev
 TOTALS_TABLE  = os.environ["TOTALS_TABLE"]       # hb_daily_totals_dev
@@ -57,17 +73,59 @@ meds_tbl    = ddb.Table(MEDS_TABLE)
 
 TZ = ZoneInfo("America/New_York")
 
+# Shared executor for overlapping independent I/O (boto3 clients are
+# thread-safe); reused across warm invocations.
+_POOL = ThreadPoolExecutor(max_workers=8)
+
+# Shared HTTP session so warm containers reuse TCP+TLS connections to
+# Nutritionix and Twilio instead of handshaking on every call. Transient
+# gateway errors retry once at the adapter level with a short backoff;
+# the Nutritionix natural-language lookups are safe to repeat.
+_HTTP = requests.Session()
+_HTTP.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=16,
+    max_retries=Retry(total=1, backoff_factor=0.2,
+                      status_forcelist=(502, 503, 504), allowed_methods=None),
+))
+
 # ---------- helpers ----------
+# Secrets are fetched once per container and reused across warm
+# invocations; each SecretsManager call is otherwise a full HTTPS RTT.
+_NX_HEADERS: dict | None = None
+_NX_GET_HEADERS: dict | None = None
+_TWILIO_CFG: dict | None = None
+
 def _nx_headers():
-    sec = secrets.get_secret_value(SecretId=NUTRITION_SECRET_NAME)
-    cfg = json.loads(sec["SecretString"])
-    return {
-        "x-app-id": cfg["app_id"],
-        "x-app-key": cfg["app_key"],
-        "Content-Type": "application/json",
-    }
+    global _NX_HEADERS, _NX_GET_HEADERS
+    if _NX_HEADERS is None:
+        sec = secrets.get_secret_value(SecretId=NUTRITION_SECRET_NAME)
+        cfg = json.loads(sec["SecretString"])
+        _NX_GET_HEADERS = {
+            "x-app-id": cfg["app_id"],
+            "x-app-key": cfg["app_key"],
+        }
+        _NX_HEADERS = {**_NX_GET_HEADERS, "Content-Type": "application/json"}
+    return _NX_HEADERS
+
+def _twilio_cfg() -> dict:
+    global _TWILIO_CFG
+    if _TWILIO_CFG is None:
+        sec = secrets.get_secret_value(SecretId=TWILIO_SECRET_NAME)["SecretString"]
+        _TWILIO_CFG = json.loads(sec)
+    return _TWILIO_CFG
 
 class NxError(Exception): ...
+
+# Hot-path regexes compiled once at module load.
+_RE_WS          = re.compile(r"\s+")
+_RE_DATE_FULL   = re.compile(r"(\d{4}-\d{2}-\d{2})(?:[ T](\d{1,2}):(\d{2})\s*(am|pm)?)?$")
+_RE_HHMM        = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$")
+_RE_TODAY_HH    = re.compile(r"(today)\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$")
+_RE_ALIAS_SPLIT = re.compile(r"[,+/]| and ")
+_RE_ALIAS_MULT  = re.compile(r"(\d+)\s*x\s+([a-z].+)$")
+_RE_MULT_SUFFIX = re.compile(r"([a-z].+?)\s*x\s*(\d+)$")
+_RE_MACRO_SPLIT = re.compile(r"[,\s]+")
+_RE_SAFE        = re.compile(r"[^a-z0-9]+")
 def _now_ms() -> int: return int(time.time() * 1000)
 
 def _extract_macros_from_food(it: dict) -> tuple[int,int,int,int,str,int,int,str]:
@@ -84,15 +142,25 @@ def _extract_macros_from_food(it: dict) -> tuple[int,int,int,int,str,int,int,str
     brand = it.get("brand_name") or ""
     return kcal, pro, carb, fat, name, qty, unit, brand
 
+# Per-container memo of Nutritionix results keyed by the normalized
+# query text. The same few meals get logged over and over, so repeats
+# skip the API round trip entirely while the container is warm.
+_NX_CACHE: dict[str, tuple[dict, list]] = {}
+_NX_CACHE_MAX = 128
+
 def _nutritionix(query: str):
     """
     Robust Nutritionix call with clear errors and a 'matched items' trace.
     Returns: (total_macros_dict, items_list) or raises NxError on failure.
     """
+    cache_key = " ".join(query.lower().split())
+    hit = _NX_CACHE.get(cache_key)
+    if hit is not None:
+        return hit
     headers = _nx_headers()
     url = "https://trackapi.nutritionix.com/v2/natural/nutrients"
     try:
-        r = requests.post(url, headers=headers, json={"query": query}, timeout=12)
+        r = _HTTP.post(url, headers=headers, json={"query": query}, timeout=12)
     except requests.Timeout:
         raise NxError("Nutritionix timed out")
     except Exception as e:
@@ -107,22 +175,28 @@ def _nutritionix(query: str):
         body = r.text[:200].replace("\n"," ")
         raise NxError(f"Nutritionix error {r.status_code}: {body}")
 
-    data = r.json()
+    data = _json_loads(r.content)
     foods = data.get("foods", []) or []
     if not foods:
         raise NxError("Nutritionix returned no matches")
 
-    total = {"calories": 0, "protein": 0, "carbs": 0, "fat": 0}
+    tc = tp = tb = tf = 0
     items_trimmed = []
     for f in foods[:20]:
         kcal, pro, carb, fat, name, qty, unit, brand = _extract_macros_from_food(f)
-        total["calories"] += kcal; total["protein"] += pro; total["carbs"] += carb; total["fat"] += fat
+        tc += kcal; tp += pro; tb += carb; tf += fat
         items_trimmed.append({
             "name": name if not brand else f"{brand} {name}",
             "serving_qty": qty,
             "serving_unit": unit,
             "kcal": kcal, "protein_g": pro, "carbs_g": carb, "fat_g": fat
         })
+    total = {"calories": tc, "protein": tp, "carbs": tb, "fat": tf}
+    if len(_NX_CACHE) >= _NX_CACHE_MAX:
+        # Default the pop: two record threads can race to evict the
+        # same oldest key when a multi-record batch runs concurrently.
+        _NX_CACHE.pop(next(iter(_NX_CACHE)), None)
+    _NX_CACHE[cache_key] = (total, items_trimmed)
     return total, items_trimmed
 
 def _nutritionix_lookup_upc(upc: str) -> dict | None:
@@ -134,14 +208,14 @@ def _nutritionix_lookup_upc(upc: str) -> dict | None:
 
     # 1) Primary UPC lookup
     try:
-        r = requests.get(
+        r = _HTTP.get(
             "https://trackapi.nutritionix.com/v2/search/item",
             headers=headers,
             params={"upc": upc},
             timeout=10
         )
         if r.status_code == 200:
-            foods = (r.json() or {}).get("foods", []) or []
+            foods = (_json_loads(r.content) or {}).get("foods", []) or []
             if foods: return foods[0]
         elif r.status_code not in (404, 400):
             log.warning(f"UPC lookup HTTP {r.status_code}: {r.text[:200]}")
@@ -150,26 +224,26 @@ def _nutritionix_lookup_upc(upc: str) -> dict | None:
 
     # 2) Fallback: instant search → hydrate
     try:
-        r2 = requests.get(
+        r2 = _HTTP.get(
             "https://trackapi.nutritionix.com/v2/search/instant",
-            headers={k:v for k,v in headers.items() if k != "Content-Type"},
+            headers=_NX_GET_HEADERS,
             params={"query": upc},
             timeout=10
         )
         if r2.status_code == 200:
-            data = r2.json() or {}
+            data = _json_loads(r2.content) or {}
             branded = data.get("branded", []) or []
             if branded:
                 nix_id = branded[0].get("nix_item_id")
                 if nix_id:
-                    r3 = requests.get(
+                    r3 = _HTTP.get(
                         "https://trackapi.nutritionix.com/v2/search/item",
                         headers=headers,
                         params={"nix_item_id": nix_id},
                         timeout=10
                     )
                     if r3.status_code == 200:
-                        foods = (r3.json() or {}).get("foods", []) or []
+                        foods = (_json_loads(r3.content) or {}).get("foods", []) or []
                         if foods: return foods[0]
     except Exception as e:
         log.exception(f"Instant fallback exception: {e}")
@@ -177,19 +251,34 @@ def _nutritionix_lookup_upc(upc: str) -> dict | None:
     return None
 
 def _norm_alias(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip().lower())
+    return _RE_WS.sub(" ", (s or "").strip().lower())
 
 def _today_est_from_ts(ts_ms: int | None) -> str:
     if ts_ms is None:
         return datetime.now(TZ).date().isoformat()
+    return _date_est_from_ts(ts_ms)
+
+@lru_cache(maxsize=512)
+def _date_est_from_ts(ts_ms: int) -> str:
     return datetime.fromtimestamp(ts_ms/1000, tz=TZ).date().isoformat()
 
+@lru_cache(maxsize=256)
+def _fmt_est(when_ms: int) -> str:
+    """Human time like '4:05 PM EST' for a millisecond timestamp."""
+    return datetime.fromtimestamp(when_ms/1000, TZ).strftime('%-I:%M %p %Z')
+
 def _as_decimal(n) -> Decimal:
+    # Ints are the common case (macros are rounded on extraction) and
+    # Decimal(int) skips the str-format-then-parse path entirely.
+    if isinstance(n, int):
+        return Decimal(n) if n >= 0 else Decimal(0)
+    if n is None:
+        return Decimal(0)
     try:
-        if n is None: return Decimal("0")
-        d = Decimal(str(n));  return d if d >= 0 else Decimal("0")
+        d = Decimal(repr(n) if isinstance(n, float) else str(n))
+        return d if d >= 0 else Decimal(0)
     except Exception:
-        return Decimal("0")
+        return Decimal(0)
 
 def _as_decimal_signed(n) -> Decimal:
     try:
@@ -198,8 +287,8 @@ def _as_decimal_signed(n) -> Decimal:
         return Decimal("0")
 
 def _decimalize_tree(x):
+    if isinstance(x, int):     return Decimal(x)
     if isinstance(x, float):   return _as_decimal(x)
-    if isinstance(x, int):     return _as_decimal(x)
     if isinstance(x, Decimal): return x
     if isinstance(x, dict):    return {k: _decimalize_tree(v) for k, v in x.items()}
     if isinstance(x, list):    return [_decimalize_tree(v) for v in x]
@@ -219,7 +308,7 @@ def _parse_when_to_ms(tokens: list[str]) -> int:
         base_dt = base_dt - timedelta(days=1)
         text = text.replace("yesterday", "").strip()
 
-    m = re.match(r"(\d{4}-\d{2}-\d{2})(?:[ T](\d{1,2}):(\d{2})\s*(am|pm)?)?$", text)
+    m = _RE_DATE_FULL.match(text)
     if m:
         y,mn,d = map(int, m.group(1).split("-"))
         hh = int(m.group(2) or 0); mm = int(m.group(3) or 0); ap = (m.group(4) or "").lower()
@@ -229,7 +318,7 @@ def _parse_when_to_ms(tokens: list[str]) -> int:
         t = datetime(y, mn, d, hh, mm, tzinfo=TZ)
         return int(t.timestamp()*1000)
 
-    m = re.match(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$", text)
+    m = _RE_HHMM.match(text)
     if m:
         hh = int(m.group(1)); mm = int(m.group(2) or 0); ap = (m.group(3) or "").lower()
         if ap in ("am","pm"):
@@ -238,7 +327,7 @@ def _parse_when_to_ms(tokens: list[str]) -> int:
         t = datetime(base_dt.year, base_dt.month, base_dt.day, hh, mm, tzinfo=TZ)
         return int(t.timestamp()*1000)
 
-    m = re.match(r"(today)\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$", text)
+    m = _RE_TODAY_HH.match(text)
     if m:
         hh = int(m.group(2)); mm = int(m.group(3) or 0); ap = (m.group(4) or "").lower()
         if ap in ("am","pm"):
@@ -259,13 +348,67 @@ def _format_duration_mins(mins: int) -> str:
     h = mins // 60; m = mins % 60
     return f"{h}h {m:02d}m"
 
+def _query_pages(tbl, **kwargs):
+    """Yield each page of a table query, following LastEvaluatedKey.
+
+    The resource-layer Key()/Attr() conditions rule out the client-level
+    paginators, so pagination is centralized here instead of repeating
+    the ExclusiveStartKey loop at every call site.
+    """
+    resp = tbl.query(**kwargs)
+    yield resp
+    while "LastEvaluatedKey" in resp:
+        resp = tbl.query(**kwargs, ExclusiveStartKey=resp["LastEvaluatedKey"])
+        yield resp
+
+# Audit events are write-only within a request, so they are buffered per
+# invocation and flushed once at the end of lambda_handler — a single
+# put for the usual one-event case, one BatchWriteItem otherwise.
+_EVENT_BUF: list[dict] = []
+
+def _log_event(item: dict) -> None:
+    _EVENT_BUF.append(item)
+
+def _flush_events() -> None:
+    if not _EVENT_BUF:
+        return
+    try:
+        if len(_EVENT_BUF) == 1:
+            events_tbl.put_item(Item=_EVENT_BUF[0])
+        else:
+            # Duplicated SNS deliveries buffer events with the same
+            # pk/sk; dedupe in the writer so the batch isn't rejected.
+            with events_tbl.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as bw:
+                for it in _EVENT_BUF:
+                    bw.put_item(Item=it)
+    finally:
+        _EVENT_BUF.clear()
+
 # ----- Food override helpers -----
+# All of the user's overrides are loaded once per warm container so
+# alias matching is a dict probe instead of a get_item per token.
+_ALIAS_CACHE: dict | None = None
+
+def _alias_load() -> dict:
+    global _ALIAS_CACHE
+    if _ALIAS_CACHE is None:
+        items = []
+        kwargs = {
+            "KeyConditionExpression": Key("pk").eq(USER_ID),
+            "ProjectionExpression": "sk, kcal, #p, carbs, fat",
+            "ExpressionAttributeNames": {"#p": "protein"},
+        }
+        try:
+            for page in _query_pages(over_tbl, **kwargs):
+                items.extend(page.get("Items", []))
+        except Exception:
+            log.exception("override cache load failed")
+            return {}
+        _ALIAS_CACHE = {it["sk"]: it for it in items}
+    return _ALIAS_CACHE
+
 def _get_override(alias: str):
-    try:
-        r = over_tbl.get_item(Key={"pk": USER_ID, "sk": _norm_alias(alias)})
-        return r.get("Item")
-    except Exception:
-        return None
+    return _alias_load().get(_norm_alias(alias))
 
 def _put_override(alias: str, macros: dict, note: str = ""):
     item = {
@@ -277,26 +420,39 @@ def _put_override(alias: str, macros: dict, note: str = ""):
         "note": note, "updated_ms": _as_decimal(_now_ms())
     }
     over_tbl.put_item(Item=item)
+    if _ALIAS_CACHE is not None:
+        _ALIAS_CACHE[item["sk"]] = item
     return item
 
 def _del_override(alias: str):
-    over_tbl.delete_item(Key={"pk": USER_ID, "sk": _norm_alias(alias)})
+    sk = _norm_alias(alias)
+    over_tbl.delete_item(Key={"pk": USER_ID, "sk": sk})
+    if _ALIAS_CACHE is not None:
+        _ALIAS_CACHE.pop(sk, None)
 
 def _match_override_in_text(text: str):
     """Return (alias, qty) if meal text contains a known alias; supports '2x alias' or 'alias x2'."""
     t = _norm_alias(text)
-    m = re.search(r"(\d+)\s*x\s+([a-z].+)$", t)
+    m = _RE_ALIAS_MULT.search(t)
     if m:
         qty = int(m.group(1)); alias = _norm_alias(m.group(2))
         if _get_override(alias): return alias, qty
-    m = re.search(r"([a-z].+?)\s*x\s*(\d+)$", t)
+    m = _RE_MULT_SUFFIX.search(t)
     if m:
         alias = _norm_alias(m.group(1)); qty = int(m.group(2))
         if _get_override(alias): return alias, qty
-    parts = re.split(r"[,+/]| and ", t)
-    for p in parts:
-        a = _norm_alias(p)
-        if _get_override(a): return a, 1
+    overrides = _alias_load()
+    if t in overrides:
+        return t, 1
+    # An alias only counts when it covers the whole text (above) or a
+    # whole separator-delimited segment — an alias embedded in a larger
+    # phrase ("rice" in "chicken rice bowl") must not swallow the meal;
+    # that text belongs to Nutritionix. Each segment is one dict probe,
+    # so multi-word aliases match without scanning the alias list.
+    for part in _RE_ALIAS_SPLIT.split(t):
+        a = _norm_alias(part)
+        if a in overrides:
+            return a, 1
     return None, 0
 
 def _macros_from_override(alias: str, qty: int = 1):
@@ -334,20 +490,33 @@ def _fact_set_config(**kwargs) -> dict:
     facts_tbl.put_item(Item=item)
     return item
 
+# Facts are written by a separate ingest Lambda and change rarely, so a
+# short-lived per-container cache avoids re-scanning the whole fact list
+# on every /fact request.
+_FACTS_CACHE: tuple[float, list] | None = None
+_FACTS_CACHE_TTL = 300.0
+
+def _fact_load_all() -> list:
+    global _FACTS_CACHE
+    now = time.monotonic()
+    if _FACTS_CACHE and _FACTS_CACHE[0] > now:
+        return _FACTS_CACHE[1]
+    kwargs = {
+        "KeyConditionExpression": Key("pk").eq(USER_ID) & Key("sk").begins_with("fact#"),
+        "ProjectionExpression": "#t, tags",
+        "ExpressionAttributeNames": {"#t": "text"},
+    }
+    items: list = []
+    for page in _query_pages(facts_tbl, **kwargs):
+        items.extend(page.get("Items", []))
+    _FACTS_CACHE = (now + _FACTS_CACHE_TTL, items)
+    return items
+
 def _fact_pick_random(tag: str | None = None) -> dict | None:
     if not _facts_available(): return None
     try:
-        resp = facts_tbl.query(
-            KeyConditionExpression=Key("pk").eq(USER_ID) & Key("sk").begins_with("fact#")
-        )
-        items = resp.get("Items", [])
-        while "LastEvaluatedKey" in resp:
-            resp = facts_tbl.query(
-                KeyConditionExpression=Key("pk").eq(USER_ID) & Key("sk").begins_with("fact#"),
-                ExclusiveStartKey=resp["LastEvaluatedKey"]
-            )
-            items.extend(resp.get("Items", []))
-    except Exception as e:
+        items = _fact_load_all()
+    except Exception:
         log.exception("facts query failed")
         return None
 
@@ -401,37 +570,35 @@ def _med_limits_for(cat_key: str) -> int | None:
 
 def _count_med_doses_this_month(cat_key: str) -> int:
     """Count total doses (items) this month for a given category."""
+    # meds sk is "{dt}#{ts_ms}", so one sort-key range on the base table
+    # covers the whole month instead of a query per calendar day. The
+    # category filter runs server-side and Select=COUNT returns only the
+    # tally \u2014 no item bodies cross the wire.
     start, end = _month_bounds_est()
-    total = 0
-    d = start
-    while d <= end:
-        q = meds_tbl.query(
-            IndexName="gsi_dt",
-            KeyConditionExpression=Key("dt").eq(d.isoformat())
-        )
-        items = q.get("Items", [])
-        total += sum(1 for it in items if _med_category_key(it.get("category","")) == cat_key)
-        while "LastEvaluatedKey" in q:
-            q = meds_tbl.query(
-                IndexName="gsi_dt",
-                KeyConditionExpression=Key("dt").eq(d.isoformat()),
-                ExclusiveStartKey=q["LastEvaluatedKey"],
-            )
-            items = q.get("Items", [])
-            total += sum(1 for it in items if _med_category_key(it.get("category","")) == cat_key)
-        d += timedelta(days=1)
-    return total
+    kwargs = {
+        "KeyConditionExpression": Key("pk").eq(USER_ID) & Key("sk").between(start.isoformat(), end.isoformat() + "#\uffff"),
+        "FilterExpression": Attr("category").eq(cat_key),
+        "Select": "COUNT",
+    }
+    return sum(page.get("Count", 0) for page in _query_pages(meds_tbl, **kwargs))
+
+# Dedicated Twilio session so basic-auth headers are computed once per
+# container and never attached to Nutritionix requests.
+_TWILIO_SESSION = requests.Session()
+_TWILIO_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+_TWILIO_URL: str | None = None
 
 def _send_sms(to_number: str, body: str) -> None:
-    sec = secrets.get_secret_value(SecretId=TWILIO_SECRET_NAME)["SecretString"]
-    cfg = json.loads(sec)
-    account_sid = cfg["account_sid"]; auth_token  = cfg["auth_token"]
+    global _TWILIO_URL
+    cfg = _twilio_cfg()
+    if _TWILIO_URL is None:
+        _TWILIO_URL = f"https://api.twilio.com/2010-04-01/Accounts/{cfg['account_sid']}/Messages.json"
+        _TWILIO_SESSION.auth = (cfg["account_sid"], cfg["auth_token"])
     from_number = cfg.get("from_wa", "whatsapp:+14155238886")  # sandbox
     if not to_number.startswith("whatsapp:"):
         to_number = "whatsapp:" + to_number.lstrip("+")
-    url  = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
     data = {"From": from_number, "To": to_number, "Body": body}
-    r = requests.post(url, data=data, auth=(account_sid, auth_token), timeout=10)
+    r = _TWILIO_SESSION.post(_TWILIO_URL, data=data, timeout=10)
     if r.status_code >= 400:
         log.error(f"Twilio send failed {r.status_code}: {r.text}")
 
@@ -489,38 +656,46 @@ def _format_meal_reply(macros: dict, new_totals: dict, matched_items: list[dict]
     return "\n".join(lines)
 
 def _sum_range(start_d: date, end_d: date) -> dict:
-    resp = totals_tbl.query(
-        KeyConditionExpression=Key("pk").eq(f"total#{USER_ID}") &
-                               Key("sk").between(start_d.isoformat(), end_d.isoformat())
-    )
+    kwargs = {
+        "KeyConditionExpression": Key("pk").eq(f"total#{USER_ID}") &
+                                  Key("sk").between(start_d.isoformat(), end_d.isoformat()),
+        "ProjectionExpression": "calories, #p, carbs, fat",
+        "ExpressionAttributeNames": {"#p": "protein"},
+    }
     cal = pro = carb = fat = 0
-    for it in resp.get("Items", []):
-        cal += int(it.get("calories", 0))
-        pro += int(it.get("protein", 0))
-        carb += int(it.get("carbs", 0))
-        fat  += int(it.get("fat", 0))
+    for page in _query_pages(totals_tbl, **kwargs):
+        for it in page.get("Items", []):
+            cal += int(it.get("calories", 0))
+            pro += int(it.get("protein", 0))
+            carb += int(it.get("carbs", 0))
+            fat  += int(it.get("fat", 0))
     days = (end_d - start_d).days + 1
     return {"cal": cal, "pro": pro, "carb": carb, "fat": fat, "days": days,
             "avg_cal": round(cal / days, 1), "avg_pro": round(pro / days, 1)}
 
 # ----- Barcode / food overrides -----
+# Accepted macro key spellings, resolved with one dict probe per token.
+_MACRO_KEYS = {
+    "k": "calories", "kcal": "calories", "cal": "calories", "calories": "calories",
+    "p": "protein", "protein": "protein", "prot": "protein",
+    "c": "carbs", "carbs": "carbs", "carb": "carbs",
+    "f": "fat", "fat": "fat",
+}
+
 def _parse_macros_arg(s: str) -> dict | None:
     if not s: return None
     out = {"calories":0,"protein":0,"carbs":0,"fat":0}
-    for part in re.split(r"[,\s]+", s.strip()):
+    for part in _RE_MACRO_SPLIT.split(s.strip()):
         if not part or "=" not in part: continue
         k,v = part.split("=",1)
         try: v = int(float(v))
         except: continue
-        k = k.lower()
-        if k in ("k","kcal","cal","calories"): out["calories"] = v
-        elif k in ("p","protein","prot"): out["protein"] = v
-        elif k in ("c","carbs","carb"): out["carbs"] = v
-        elif k in ("f","fat"): out["fat"] = v
+        key = _MACRO_KEYS.get(k.lower())
+        if key: out[key] = v
     return out
 
 def _safe_alias(name: str) -> str:
-    alias = re.sub(r"[^a-z0-9]+","-", (name or "").lower()).strip("-")
+    alias = _RE_SAFE.sub("-", (name or "").lower()).strip("-")
     return alias or "item"
 
 def _handle_barcode(sender: str, args: str):
@@ -562,7 +737,12 @@ def _handle_food(sender: str, args: str):
     sub = parts[0].lower()
 
     if sub == "list":
-        r = over_tbl.query(KeyConditionExpression=Key("pk").eq(USER_ID))
+        r = over_tbl.query(
+            KeyConditionExpression=Key("pk").eq(USER_ID),
+            Limit=20,
+            ProjectionExpression="sk, kcal, #p, carbs, fat",
+            ExpressionAttributeNames={"#p": "protein"},
+        )
         items = r.get("Items", [])
         if not items: _send_sms(sender, "No custom foods."); return
         lines = ["Custom foods:"]
@@ -685,54 +865,80 @@ def _handle_facts(sender: str, args: str, simulate: bool = False):
               "Usage: /fact [tag] | /facts on [hour] | /facts off | /facts hour <0-23> | /facts number <...> | /facts status")
 
 # ---------- meals core ----------
+def _macros_to_decimal(m: dict) -> dict:
+    """Fast path for the fixed macro shape; skips the generic tree walk."""
+    return {
+        "calories": Decimal(int(m.get("calories", 0))),
+        "protein":  Decimal(int(m.get("protein", 0))),
+        "carbs":    Decimal(int(m.get("carbs", 0))),
+        "fat":      Decimal(int(m.get("fat", 0))),
+    }
+
 def _write_enriched_event(meal_pk: str, ts_ms: int, dt: str, text: str, macros: dict, channel: str):
-    events_tbl.put_item(Item={
+    _log_event({
         "pk": meal_pk, "sk": str(ts_ms),
         "type": "meal.enriched", "text": text,
-        "nutrition": _decimalize_tree(macros), "dt": dt,
+        "nutrition": _macros_to_decimal(macros), "dt": dt,
         "uid": USER_ID, "source": channel
     })
 
-def _put_meal_row_idempotent(user_id: str, dt: str, ts_ms: int, sender: str, meal_text: str, macros: dict, channel: str):
+_TYPE_SER = TypeSerializer()
+
+def _save_meal_and_totals(user_id: str, dt: str, ts_ms: int, sender: str, meal_text: str, macros: dict, channel: str, now_ms: int | None = None) -> tuple[bool, dict]:
+    """
+    Write the meal row and the totals bump as one TransactWriteItems call.
+    Returns (created, new_totals). A duplicate meal cancels the whole
+    transaction, so totals are never double-counted on redelivery.
+    """
+    if now_ms is None:
+        now_ms = _now_ms()
     meal_id = _meal_id(user_id, dt, meal_text, ts_ms)
     item = {
         "pk": user_id, "sk": f"{dt}#{meal_id}", "dt": dt, "meal_id": meal_id,
         "raw_text": meal_text, "raw_text_norm": meal_text.strip().lower(),
         "sender": _sender_e164(sender), "channel": channel, "day_tz": "America/New_York",
-        "kcal": _as_decimal(macros.get("calories", 0)),
-        "protein_g": _as_decimal(macros.get("protein", 0)),
-        "carbs_g": _as_decimal(macros.get("carbs", 0)),
-        "fat_g": _as_decimal(macros.get("fat", 0)),
-        "created_ms": _as_decimal(_now_ms()),
+        # TypeSerializer renders ints as N values directly, so the known
+        # integer fields skip the Decimal detour.
+        "kcal": int(macros.get("calories", 0)),
+        "protein_g": int(macros.get("protein", 0)),
+        "carbs_g": int(macros.get("carbs", 0)),
+        "fat_g": int(macros.get("fat", 0)),
+        "created_ms": now_ms,
         "schema_version": 1
     }
+    ser = _TYPE_SER.serialize
+    created = True
     try:
-        meals_tbl.put_item(Item=item, ConditionExpression="attribute_not_exists(pk) AND attribute_not_exists(sk)")
-        return True, meal_id
+        ddb.meta.client.transact_write_items(TransactItems=[
+            {"Put": {
+                "TableName": MEALS_TABLE,
+                "Item": {k: ser(v) for k, v in item.items()},
+                "ConditionExpression": "attribute_not_exists(pk) AND attribute_not_exists(sk)",
+            }},
+            {"Update": {
+                "TableName": TOTALS_TABLE,
+                "Key": {"pk": ser(f"total#{USER_ID}"), "sk": ser(dt)},
+                "UpdateExpression": "ADD calories :c, protein :p, carbs :b, fat :f SET last_update_ms = :now",
+                "ExpressionAttributeValues": {
+                    ":c": ser(int(macros.get("calories", 0))),
+                    ":p": ser(int(macros.get("protein", 0))),
+                    ":b": ser(int(macros.get("carbs", 0))),
+                    ":f": ser(int(macros.get("fat", 0))),
+                    ":now": ser(now_ms),
+                },
+            }},
+        ])
     except Exception as e:
-        if "ConditionalCheckFailed" in str(e): log.info("Meal exists; skip")
-        else: log.exception("meals put failed")
-        return False, meal_id
-
-def _update_totals(dt: str, deltas: dict) -> dict:
-    key = {"pk": f"total#{USER_ID}", "sk": dt}
-    totals_tbl.update_item(
-        Key=key,
-        UpdateExpression="ADD calories :c, protein :p, carbs :b, fat :f SET last_update_ms = :now",
-        ExpressionAttributeValues={
-            ":c": _as_decimal(deltas.get("calories", 0)),
-            ":p": _as_decimal(deltas.get("protein", 0)),
-            ":b": _as_decimal(deltas.get("carbs", 0)),
-            ":f": _as_decimal(deltas.get("fat", 0)),
-            ":now": _as_decimal(_now_ms()),
-        }
-    )
-    got = totals_tbl.get_item(Key=key)
-    return got.get("Item") or {}
+        if "ConditionalCheckFailed" in str(e) or "TransactionCanceled" in str(e):
+            log.info("Meal exists; skip")
+        else:
+            log.exception("meal transact failed")
+        created = False
+    return created, _get_totals_for_day(dt)
 
 def _decrement_totals(dt: str, macros: dict) -> dict:
     key = {"pk": f"total#{USER_ID}", "sk": dt}
-    totals_tbl.update_item(
+    resp = totals_tbl.update_item(
         Key=key,
         UpdateExpression="ADD calories :c, protein :p, carbs :b, fat :f SET last_update_ms = :now",
         ExpressionAttributeValues={
@@ -741,14 +947,17 @@ def _decrement_totals(dt: str, macros: dict) -> dict:
             ":b": _as_decimal_signed(-int(macros.get("carbs", 0))),
             ":f": _as_decimal_signed(-int(macros.get("fat", 0))),
             ":now": _as_decimal(_now_ms()),
-        }
+        },
+        ReturnValues="ALL_NEW",
     )
-    got = totals_tbl.get_item(Key=key)
-    return got.get("Item") or {}
+    return resp.get("Attributes") or {}
 
 def _meal_id(user_id: str, dt: str, text: str, ts_ms: int) -> str:
+    # Opaque dedup key, not a cryptographic commitment: blake2b at 128
+    # bits is ~2x faster than sha256 on short inputs and needs no
+    # truncation slice.
     raw = f"{user_id}|{dt}|{(text or '').strip()}|{ts_ms}"
-    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
 
 def _channel(sender: str) -> str:
     return "wa" if str(sender).startswith("whatsapp:") else "sms"
@@ -764,17 +973,28 @@ def _parse_migraine_category(text: str) -> str:
         if c in text: return c
     return "non-aura"
 
+# Per-invocation memo for lookups several handlers repeat within one SNS
+# batch (open migraine, open fast). Cleared at the top of lambda_handler
+# and invalidated by the writes that change the answer.
+_INV_CACHE: dict = {}
+_CACHE_MISS = object()
+
 def _open_episode():
     """Return last open migraine episode or None."""
+    cached = _INV_CACHE.get("open_episode", _CACHE_MISS)
+    if cached is not _CACHE_MISS:
+        return cached
+    # gsi_open holds only rows with is_open set, so the open episode (at
+    # most one) comes back directly instead of sifting recent history.
     resp = migs_tbl.query(
-        KeyConditionExpression=Key("pk").eq(USER_ID) & Key("sk").begins_with("migraine#"),
-        ScanIndexForward=False,
-        Limit=25
+        IndexName="gsi_open",
+        KeyConditionExpression=Key("pk").eq(USER_ID) & Key("is_open").eq(1),
+        Limit=1
     )
-    for it in resp.get("Items", []):
-        if int(it.get("is_open", 0)) == 1:
-            return it
-    return None
+    items = resp.get("Items", [])
+    ep = items[0] if items else None
+    _INV_CACHE["open_episode"] = ep
+    return ep
 
 def _start_migraine(sender: str, when_ms: int, cat: str, note: str):
     ep_id = hashlib.sha256(f"{USER_ID}|{when_ms}".encode()).hexdigest()[:16]
@@ -787,7 +1007,8 @@ def _start_migraine(sender: str, when_ms: int, cat: str, note: str):
         "schema_version": 1
     }
     migs_tbl.put_item(Item=item, ConditionExpression="attribute_not_exists(pk) AND attribute_not_exists(sk)")
-    _send_sms(sender, f"Migraine started ({cat}) at {datetime.fromtimestamp(when_ms/1000, TZ).strftime('%-I:%M %p %Z')}.")
+    _INV_CACHE.pop("open_episode", None)
+    _send_sms(sender, f"Migraine started ({cat}) at {_fmt_est(when_ms)}.")
 
 def _end_migraine(sender: str, when_ms: int, note: str):
     ep = _open_episode()
@@ -809,41 +1030,60 @@ def _end_migraine(sender: str, when_ms: int, note: str):
         eav[":n"] = combined
 
     migs_tbl.update_item(Key=key, UpdateExpression=expr, ExpressionAttributeValues=eav)
+    _INV_CACHE.pop("open_episode", None)
 
     start_ms = int(ep.get("start_ms", 0))
     dur_min = max(0, int((when_ms - start_ms) / 60000))
     _send_sms(sender, f"Migraine ended. Duration ≈ {dur_min} min.")
 
 # ---------- medication logging ----------
+# Ordered by how often each category actually gets logged, so the
+# substring fallback in _classify_med tries the likely names first.
 MED_CATS = {
+    "normal pain med": ["ibuprofen","advil","motrin","naproxen","aleve","acetaminophen","tylenol"],
     "triptan": ["sumatriptan","rizatriptan","eletriptan","zolmitriptan","almotriptan","frovatriptan","naratriptan"],
-    "DHE": ["dihydroergotamine","migranal","dhe"],
     "excedrin": ["excedrin"],
-    "normal pain med": ["ibuprofen","advil","motrin","naproxen","aleve","acetaminophen","tylenol"],
-    "ketorolac": ["ketorolac","toradol"],
-    "hydroxyzine": ["hydroxyzine","atarax","vistaril"],
     "zofran": ["zofran","ondansetron"],
+    "hydroxyzine": ["hydroxyzine","atarax","vistaril"],
+    "ketorolac": ["ketorolac","toradol"],
+    "DHE": ["dihydroergotamine","migranal","dhe"],
     "benadryl im": ["diphenhydramine im","benadryl im","diphenhydramine injection"]
 }
 
+# Flattened name -> category map and the regexes used on every /med,
+# built once at import instead of per classification.
+_MED_FLAT = {n: cat for cat, names in MED_CATS.items() for n in names}
+_MED_NAMES = list(_MED_FLAT)
+_DOSE_RE = re.compile(r"(\d+\.?\d*)\s*(mg|mcg|g|ml)")
+_TOKEN_RE = re.compile(r"[a-z]+")
+
 def _classify_med(text: str) -> tuple[str,str]:
     t = text.lower()
-    for cat, names in MED_CATS.items():
-        for n in names:
-            if n in t:
-                return (cat, n)
-    flat = {n: cat for cat, names in MED_CATS.items() for n in names}
-    tokens = re.findall(r"[a-z]+", t)
+    # Fast path: exact token hits resolve with one dict probe each, which
+    # covers nearly every real /med message.
+    for tok in _TOKEN_RE.findall(t):
+        cat = _MED_FLAT.get(tok)
+        if cat:
+            return (cat, tok)
+    # Substring scan still catches multi-word names and attached doses
+    # ("diphenhydramine im", "excedrin500mg").
+    for n in _MED_NAMES:
+        if n in t:
+            return (_MED_FLAT[n], n)
+    # difflib is only needed on this rare fuzzy-fallback path; importing
+    # it lazily keeps it off the cold-start budget.
+    from difflib import get_close_matches
+    tokens = _TOKEN_RE.findall(t)
     best = None
     for tok in tokens:
-        m = get_close_matches(tok, flat.keys(), n=1, cutoff=0.85)
+        m = get_close_matches(tok, _MED_NAMES, n=1, cutoff=0.85)
         if m:
             best = m[0]; break
-    if best: return (flat[best], best)
+    if best: return (_MED_FLAT[best], best)
     return ("unknown", t.strip())
 
 def _log_med(sender: str, when_ms: int, text_after: str):
-    dose_match = re.search(r"(\d+\.?\d*)\s*(mg|mcg|g|ml)", text_after.lower())
+    dose_match = _DOSE_RE.search(text_after.lower())
     dose = dose_match.group(0) if dose_match else ""
 
     raw_cat, matched_name = _classify_med(text_after)
@@ -864,40 +1104,44 @@ def _log_med(sender: str, when_ms: int, text_after: str):
     ep = _open_episode()
     link_msg = ""
     if ep:
+        # A compact reference is enough to rejoin the full dose later via
+        # its sk; embedding whole dose items bloats the episode row.
+        med_ref = {"sk": sk, "ts_ms": item["ts_ms"], "category": cat_key}
         migs_tbl.update_item(
             Key={"pk": ep["pk"], "sk": ep["sk"]},
             UpdateExpression="SET meds = list_append(if_not_exists(meds, :z), :m)",
-            ExpressionAttributeValues={":z": [], ":m": [item]},
+            ExpressionAttributeValues={":z": [], ":m": [med_ref]},
         )
         link_msg = " (linked to current migraine)"
 
     # --- 24h interaction safety checks ---
     warnings = []
-    window_start_ms = when_ms - 24*60*60*1000
-    dates_to_check = {_today_est_from_ts(when_ms), _today_est_from_ts(window_start_ms)}
-    recent: list[dict] = []
-    for dtx in dates_to_check:
-        q = meds_tbl.query(IndexName="gsi_dt", KeyConditionExpression=Key("dt").eq(dtx))
-        recent.extend(q.get("Items", []))
-        while "LastEvaluatedKey" in q:
-            q = meds_tbl.query(
-                IndexName="gsi_dt",
-                KeyConditionExpression=Key("dt").eq(dtx),
-                ExclusiveStartKey=q["LastEvaluatedKey"],
-            )
-            recent.extend(q.get("Items", []))
-
-    recent_cats = [
-        (_med_category_key(it.get("category", "")), int(it.get("ts_ms", 0)))
-        for it in recent
-        if abs(when_ms - int(it.get("ts_ms", 0))) < 24*60*60*1000
-    ]
-
-    if cat_key == "triptan":
-        if any(rc in ("dhe", "triptan") and abs(when_ms - ts) < 24*60*60*1000 for rc, ts in recent_cats):
+    # Only triptan and DHE doses have a 24h interaction rule, so other
+    # categories skip the window query entirely.
+    if cat_key in ("triptan", "dhe"):
+        # sk is "{dt}#{ts_ms}" with 13-digit ms timestamps, so lexicographic
+        # order matches chronological order and the whole 24h window is one
+        # strongly consistent base-table range query. The upper bound stops
+        # just short of the dose we just wrote so it cannot warn on itself.
+        window_start_ms = when_ms - 24*60*60*1000
+        cond = Key("pk").eq(USER_ID) & Key("sk").between(
+            f"{_today_est_from_ts(window_start_ms)}#{window_start_ms}",
+            f"{dt}#{when_ms - 1}",
+        )
+        recent: list[dict] = []
+        for page in _query_pages(
+            meds_tbl,
+            KeyConditionExpression=cond,
+            FilterExpression=Attr("category").is_in(["triptan", "dhe"]),
+            ProjectionExpression="category, ts_ms",
+        ):
+            recent.extend(page.get("Items", []))
+
+        recent_cats = {_med_category_key(it.get("category", "")) for it in recent}
+
+        if cat_key == "triptan" and recent_cats & {"dhe", "triptan"}:
             warnings.append("⚠️ Triptans should NOT be used within 24h of any triptan or DHE.")
-    if cat_key == "dhe":
-        if any(rc == "triptan" and abs(when_ms - ts) < 24*60*60*1000 for rc, ts in recent_cats):
+        if cat_key == "dhe" and "triptan" in recent_cats:
             warnings.append("⚠️ DHE should NOT be used within 24h of any triptan.")
 
     # --- monthly limit checks (doses used) ---
@@ -920,6 +1164,9 @@ def _log_med(sender: str, when_ms: int, text_after: str):
         + (f" {msg_tail}" if msg_tail else "")
     )
 
+_WHEN_RE = re.compile(r"(\d{1,2}(?::\d{2})?\s*(?:am|pm))")
+_WHEN_WORDS = frozenset(("am", "pm", "yesterday", "today"))
+
 def _handle_med(sender: str, args: str, simulate: bool = False):
     """
     /med <free text>
@@ -932,14 +1179,16 @@ def _handle_med(sender: str, args: str, simulate: bool = False):
     when_tokens: list[str] = []
     text_tokens = tokens[:]
 
-    if tokens and tokens[-1].lower() in ("am", "pm", "yesterday", "today"):
+    if tokens and tokens[-1].lower() in _WHEN_WORDS:
         when_tokens = tokens[-2:] if len(tokens) >= 2 else tokens[-1:]
         text_tokens = tokens[:-len(when_tokens)]
-    elif re.search(r"(\d{1,2}(:\d{2})?\s*(am|pm))", (args or "").lower()):
-        m = re.search(r"(\d{1,2}(?::\d{2})?\s*(?:am|pm))", (args or "").lower())
+    else:
+        m = _WHEN_RE.search((args or "").lower())
         if m:
             when_tokens = [m.group(1)]
-            text_tokens = re.sub(re.escape(m.group(1)), "", args, flags=re.IGNORECASE).split()
+            # Slice the matched span out of the original text; it maps
+            # index-for-index onto the lowered copy we searched.
+            text_tokens = (args[:m.start()] + args[m.end():]).split()
 
     when_ms = _parse_when_to_ms(when_tokens)
     text_after = " ".join(text_tokens).strip()
@@ -948,7 +1197,7 @@ def _handle_med(sender: str, args: str, simulate: bool = False):
         return
 
     if simulate or DRY_RUN:
-        tdisp = datetime.fromtimestamp(when_ms/1000, TZ).strftime('%-I:%M %p %Z')
+        tdisp = _fmt_est(when_ms)
         _send_sms(sender, f"[TEST] Would log med: {text_after} at {tdisp}")
         return
 
@@ -972,15 +1221,18 @@ def _set_fast_goal_hours(hours: int):
 
 def _open_fast():
     """Return the most recent open fast or None."""
+    cached = _INV_CACHE.get("open_fast", _CACHE_MISS)
+    if cached is not _CACHE_MISS:
+        return cached
     resp = fast_tbl.query(
-        KeyConditionExpression=Key("pk").eq(USER_ID) & Key("sk").begins_with("fast#"),
-        ScanIndexForward=False,
-        Limit=25
+        IndexName="gsi_open",
+        KeyConditionExpression=Key("pk").eq(USER_ID) & Key("is_open").eq(1),
+        Limit=1
     )
-    for it in resp.get("Items", []):
-        if int(it.get("is_open", 0)) == 1:
-            return it
-    return None
+    items = resp.get("Items", [])
+    ep = items[0] if items else None
+    _INV_CACHE["open_fast"] = ep
+    return ep
 
 def _start_fast(sender: str, when_ms: int):
     ep_id = hashlib.sha256(f"fast|{USER_ID}|{when_ms}".encode()).hexdigest()[:16]
@@ -992,8 +1244,9 @@ def _start_fast(sender: str, when_ms: int):
         "is_open": _as_decimal(1), "schema_version": 1
     }
     fast_tbl.put_item(Item=item, ConditionExpression="attribute_not_exists(pk) AND attribute_not_exists(sk)")
-    events_tbl.put_item(Item={"pk": USER_ID, "sk": str(_now_ms()), "type": "fast.start", "dt": dt, "start_ms": _as_decimal(when_ms)})
-    tdisp = datetime.fromtimestamp(when_ms/1000, TZ).strftime('%-I:%M %p %Z')
+    _log_event({"pk": USER_ID, "sk": str(_now_ms()), "type": "fast.start", "dt": dt, "start_ms": _as_decimal(when_ms)})
+    _INV_CACHE.pop("open_fast", None)
+    tdisp = _fmt_est(when_ms)
     _send_sms(sender, f"Fasting started at {tdisp}.")
 
 def _end_fast(sender: str, when_ms: int):
@@ -1001,17 +1254,20 @@ def _end_fast(sender: str, when_ms: int):
     if not ep:
         _send_sms(sender, "No open fast to end."); return
     key = {"pk": ep["pk"], "sk": ep["sk"]}
-    fast_tbl.update_item(
+    upd_f = _POOL.submit(
+        fast_tbl.update_item,
         Key=key,
         UpdateExpression="SET end_ms=:e, is_open=:z",
         ExpressionAttributeValues={":e": _as_decimal(when_ms), ":z": _as_decimal(0)}
     )
+    _INV_CACHE.pop("open_fast", None)
     start_ms = int(ep.get("start_ms", 0))
     dur_min = max(0, int((when_ms - start_ms)/60000))
     goal = _get_fast_goal_hours()
     status = "✅ Met goal" if dur_min >= goal*60 else f"⏳ Short by {max(0, goal*60 - dur_min)} min"
-    events_tbl.put_item(Item={"pk": USER_ID, "sk": str(_now_ms()), "type": "fast.end", "dt": _today_est_from_ts(when_ms),
-                              "start_ms": _as_decimal(start_ms), "end_ms": _as_decimal(when_ms), "dur_min": _as_decimal(dur_min)})
+    _log_event({"pk": USER_ID, "sk": str(_now_ms()), "type": "fast.end", "dt": _today_est_from_ts(when_ms),
+                "start_ms": _as_decimal(start_ms), "end_ms": _as_decimal(when_ms), "dur_min": _as_decimal(dur_min)})
+    upd_f.result()
     _send_sms(sender, f"Fast ended. Duration ≈ {_format_duration_mins(dur_min)} ({status}).")
 
 def _fast_status(sender: str):
@@ -1022,7 +1278,7 @@ def _fast_status(sender: str):
         now_ms = _now_ms()
         dur_min = max(0, int((now_ms - start_ms)/60000))
         pct = min(100, int((dur_min/(goal*60)) * 100)) if goal > 0 else 0
-        tstart = datetime.fromtimestamp(start_ms/1000, TZ).strftime('%-I:%M %p %Z')
+        tstart = _fmt_est(start_ms)
         _send_sms(sender, f"Fasting (open since {tstart}): {_format_duration_mins(dur_min)} elapsed. Goal: {goal}h ({pct}%).")
         return
     # last completed
@@ -1070,7 +1326,7 @@ def _handle_fast(sender: str, args: str, simulate: bool = False):
         when_tokens = parts[1:]
         when_ms = _parse_when_to_ms(when_tokens)
         if simulate or DRY_RUN:
-            tdisp = datetime.fromtimestamp(when_ms/1000, TZ).strftime('%-I:%M %p %Z')
+            tdisp = _fmt_est(when_ms)
             _send_sms(sender, f"[TEST] Would {sub} fast at {tdisp}.")
             return
         if sub == "start": _start_fast(sender, when_ms)
@@ -1111,12 +1367,15 @@ def _handle_summary(sender: str, dt: str):
     _send_sms(sender, _format_summary_lines(_get_totals_for_day(dt)))
 
 def _handle_lookup(sender: str, dt: str, text_after_lookup: str):
+    # The totals read is independent of the Nutritionix call; overlap
+    # them so the handler waits on the slower of the two, not the sum.
+    totals_f = _POOL.submit(_get_totals_for_day, dt)
     try:
         macros, items = _nutritionix(text_after_lookup)
     except NxError as e:
         _send_sms(sender, f"Lookup failed — {str(e)}"); return
 
-    today = _get_totals_for_day(dt)
+    today = totals_f.result()
     hypo_cal = int(today.get("calories", 0)) + macros["calories"]
     hypo_pro = int(today.get("protein", 0))  + macros["protein"]
 
@@ -1150,10 +1409,10 @@ def _handle_meal(sender: str, dt: str, ts_ms: int, meal_pk: str, text: str, simu
             hypo_pro = int(today.get("protein", 0))  + macros["protein"]
             _send_sms(sender, f"[TEST] Would save meal (override {alias} x{qty}): {macros['calories']} kcal ({macros['protein']} P / {macros['carbs']} C / {macros['fat']} F).\nTotals would become: {hypo_cal} / {CALORIES_MAX} kcal, {hypo_pro} / {PROTEIN_MIN} P.")
             return
+        now_ms = _now_ms()
         _write_enriched_event(meal_pk=meal_pk, ts_ms=ts_ms, dt=dt, text=f"[override] {text}", macros=macros, channel=channel)
-        created, _ = _put_meal_row_idempotent(USER_ID, dt, ts_ms, sender, text, macros, channel)
+        created, new_totals = _save_meal_and_totals(USER_ID, dt, ts_ms, sender, text, macros, channel, now_ms=now_ms)
         if not created: log.info("Idempotent meal write skipped (override).")
-        new_totals = _update_totals(dt, macros)
         if sender: _send_sms(sender, _format_meal_reply(macros, new_totals, prefix="Meal saved (override)"))
         return
 
@@ -1171,14 +1430,20 @@ def _handle_meal(sender: str, dt: str, ts_ms: int, meal_pk: str, text: str, simu
                           f"Then totals: {hypo_cal} / {CALORIES_MAX} kcal, {hypo_pro} / {PROTEIN_MIN} P.")
         return
 
+    now_ms = _now_ms()
     _write_enriched_event(meal_pk=meal_pk, ts_ms=ts_ms, dt=dt, text=text, macros=macros, channel=channel)
-    created, _ = _put_meal_row_idempotent(USER_ID, dt, ts_ms, sender, text, macros, channel)
+    created, new_totals = _save_meal_and_totals(USER_ID, dt, ts_ms, sender, text, macros, channel, now_ms=now_ms)
     if not created: log.info("Idempotent meal write skipped.")
-    new_totals = _update_totals(dt, macros)
     if sender: _send_sms(sender, _format_meal_reply(macros, new_totals, matched_items=items))
 
 def _handle_undo(sender: str, dt: str, simulate: bool = False):
-    resp = meals_tbl.query(KeyConditionExpression=Key("pk").eq(USER_ID) & Key("sk").begins_with(f"{dt}#"))
+    # Meal sks are "{dt}#{hash}", so sort-key order is not insertion
+    # order; the max() over created_ms stays, but undo only needs the
+    # keys and macros, not the full items.
+    resp = meals_tbl.query(
+        KeyConditionExpression=Key("pk").eq(USER_ID) & Key("sk").begins_with(f"{dt}#"),
+        ProjectionExpression="pk, sk, meal_id, created_ms, kcal, protein_g, carbs_g, fat_g",
+    )
     items = resp.get("Items", [])
     if not items:
         _send_sms(sender, "No meals found for today."); return
@@ -1190,8 +1455,8 @@ def _handle_undo(sender: str, dt: str, simulate: bool = False):
         return
     _decrement_totals(dt, macros)
     meals_tbl.delete_item(Key={"pk": latest["pk"], "sk": latest["sk"]})
-    events_tbl.put_item(Item={"pk": USER_ID, "sk": str(_now_ms()), "type": "meal.undo", "dt": dt,
-                              "ref": latest.get("meal_id"), "kcal": _as_decimal(macros["calories"])})
+    _log_event({"pk": USER_ID, "sk": str(_now_ms()), "type": "meal.undo", "dt": dt,
+                "ref": latest.get("meal_id"), "kcal": _as_decimal(macros["calories"])})
     _send_sms(sender, f"Undid last meal: -{macros['calories']} kcal, -{macros['protein']} P.")
 
 def _handle_reset_today(sender: str, dt: str, simulate: bool = False):
@@ -1202,7 +1467,7 @@ def _handle_reset_today(sender: str, dt: str, simulate: bool = False):
     totals_tbl.update_item(Key=key,
         UpdateExpression="SET calories=:z, protein=:z, carbs=:z, fat=:z, last_update_ms=:now",
         ExpressionAttributeValues={":z": _as_decimal(0), ":now": _as_decimal(_now_ms())})
-    events_tbl.put_item(Item={"pk": USER_ID, "sk": str(_now_ms()), "type": "totals.reset", "dt": dt})
+    _log_event({"pk": USER_ID, "sk": str(_now_ms()), "type": "totals.reset", "dt": dt})
     _send_sms(sender, "Today’s totals have been reset to 0. (Meals remain.)")
 
 def _handle_migraine(sender: str, args: str, simulate: bool = False):
@@ -1221,7 +1486,7 @@ def _handle_migraine(sender: str, args: str, simulate: bool = False):
         when_ms = _parse_when_to_ms(when_tokens)
         note = " ".join(note_tokens) if note_tokens else ""
         if simulate or DRY_RUN:
-            tdisp = datetime.fromtimestamp(when_ms/1000, TZ).strftime('%-I:%M %p %Z')
+            tdisp = _fmt_est(when_ms)
             _send_sms(sender, f"[TEST] Would start migraine ({cat}) at {tdisp}. Note: {note or '(none)'}")
             return
         _start_migraine(sender, when_ms, cat, note)
@@ -1231,7 +1496,7 @@ def _handle_migraine(sender: str, args: str, simulate: bool = False):
         when_ms = _parse_when_to_ms(when_tokens)
         note = " ".join([t for t in when_tokens if t not in ("now","today","yesterday")])
         if simulate or DRY_RUN:
-            tdisp = datetime.fromtimestamp(when_ms/1000, TZ).strftime('%-I:%M %p %Z')
+            tdisp = _fmt_est(when_ms)
             _send_sms(sender, f"[TEST] Would end migraine at {tdisp}. Note: {note or '(none)'}")
             return
         _end_migraine(sender, when_ms, note)
@@ -1241,15 +1506,19 @@ def _handle_migraine(sender: str, args: str, simulate: bool = False):
 def _meds_summary(days: int):
     end = datetime.now(TZ).date()
     start = end - timedelta(days=days-1)
-    agg = {}  # category -> count
-    total = 0
-    for i in range(days):
-        day = (start + timedelta(days=i)).strftime("%Y-%m-%d")
-        resp = meds_tbl.query(IndexName="gsi_dt", KeyConditionExpression=Key("dt").eq(day), ScanIndexForward=False)
-        for it in resp.get("Items", []):
-            cat = (_med_category_key(it.get("category") or "unknown")).lower()
-            agg[cat] = agg.get(cat, 0) + 1
-            total += 1
+    # Doses sort by "{dt}#{ts_ms}", so the whole window is one base-table
+    # range query instead of a gsi_dt query per day.
+    cond = Key("pk").eq(USER_ID) & Key("sk").between(
+        f"{start.isoformat()}#", f"{end.isoformat()}#\uffff"
+    )
+    items: list[dict] = []
+    for page in _query_pages(meds_tbl, KeyConditionExpression=cond, ProjectionExpression="category"):
+        items.extend(page.get("Items", []))
+
+    agg = Counter(
+        (_med_category_key(it.get("category") or "unknown")).lower() for it in items
+    )
+    total = sum(agg.values())
     lines = [f"- {k}: {v} dose(s)" for k, v in sorted(agg.items(), key=lambda x: (-x[1], x[0]))]
     return f"Doses last {days}d: {total}\n" + ("\n".join(lines) if lines else "No doses.")
 
@@ -1265,68 +1534,128 @@ def _handle_meds_month(sender: str):
     _send_sms(sender, _meds_summary(today.day))
 
 # ---------- handler ----------
+def _parse_command(raw_text: str) -> tuple[str, str]:
+    """
+    Single-pass tokenize of an inbound message into (cmd, arg).
+    cmd is the lowercased head token with any trailing ':' stripped;
+    arg is the remainder after the first ':' or space, stripped.
+    """
+    t = raw_text
+    for i, ch in enumerate(t):
+        if ch == ":":
+            return t[:i].lower(), t[i+1:].strip()
+        if ch == " ":
+            return t[:i].lower(), t[i+1:].strip()
+    return t.lower(), ""
+
+# Command dispatch tables. Handlers share one signature
+# (sender, dt, ts_ms, meal_pk, arg, simulate) so routing is a dict probe
+# for exact commands and a short ordered prefix scan for the rest.
+# Order matters in the prefix list: /facts before /fact before /fast,
+# and "/med" last so "/meds <junk>" keeps falling through to it.
+_EXACT_CMDS = {
+    "/help":        lambda s, dt, ts, pk, a, sim: _handle_help(s),
+    "help":         lambda s, dt, ts, pk, a, sim: _handle_help(s),
+    "/week":        lambda s, dt, ts, pk, a, sim: _handle_week(s),
+    "/month":       lambda s, dt, ts, pk, a, sim: _handle_month(s),
+    "/undo":        lambda s, dt, ts, pk, a, sim: _handle_undo(s, dt, simulate=sim),
+    "/reset today": lambda s, dt, ts, pk, a, sim: _handle_reset_today(s, dt, simulate=sim),
+    "/meds":        lambda s, dt, ts, pk, a, sim: _handle_meds(s),
+    "/meds today":  lambda s, dt, ts, pk, a, sim: _handle_meds_today(s),
+    "/meds month":  lambda s, dt, ts, pk, a, sim: _handle_meds_month(s),
+}
+
+_PREFIX_CMDS = (
+    ("/summary",  lambda s, dt, ts, pk, a, sim: _handle_summary(s, dt)),
+    ("/barcode",  lambda s, dt, ts, pk, a, sim: _handle_barcode(s, a)),
+    ("/food",     lambda s, dt, ts, pk, a, sim: _handle_food(s, a)),
+    ("/lookup:",  lambda s, dt, ts, pk, a, sim: _handle_lookup(s, dt, a) if a else _send_sms(s, "Usage: /lookup: <meal>")),
+    ("/lookup ",  lambda s, dt, ts, pk, a, sim: _handle_lookup(s, dt, a) if a else _send_sms(s, "Usage: /lookup: <meal>")),
+    ("/migraine", lambda s, dt, ts, pk, a, sim: _handle_migraine(s, a, simulate=sim)),
+    ("/facts",    lambda s, dt, ts, pk, a, sim: _handle_facts(s, a, simulate=sim)),
+    ("/fact",     lambda s, dt, ts, pk, a, sim: _handle_fact(s, a, simulate=sim)),
+    ("/fast",     lambda s, dt, ts, pk, a, sim: _handle_fast(s, a, simulate=sim)),
+    ("/med",      lambda s, dt, ts, pk, a, sim: _handle_med(s, a, simulate=sim)),
+)
+
+def _process_record(rec):
+    msg = _json_loads(rec["Sns"]["Message"])
+    raw_text = (msg.get("text") or msg.get("body") or "").strip()
+    # Carriers can deliver empty bodies (delivery receipts etc.); bail
+    # before any string ops or an outbound reply. Also cap pathological
+    # lengths so the regex/partition work downstream stays bounded.
+    if not raw_text or len(raw_text) > 1600:
+        return
+    sender = msg.get("sender") or msg.get("from") or ""
+    meal_pk = msg.get("pk") or USER_ID
+
+    simulate = False
+    if raw_text.lower().startswith("/test "):
+        simulate = True
+        raw_text = raw_text[6:].strip()
+
+    ts_ms = _parse_ts(msg.get("sk"))
+    dt = _today_est_from_ts(ts_ms)  # EST day boundary
+
+    lower = raw_text.lower()
+    # Single-pass tokenize, then intern the head token (never the full
+    # text) so the exact-match command comparisons below reduce to
+    # pointer equality against the already-interned literals.
+    cmd, arg = _parse_command(raw_text)
+    cmd = sys.intern(cmd)
+    if lower == cmd:
+        lower = cmd
+    # meal: is the dominant message type — test it first so the common
+    # case pays one comparison instead of walking the whole ladder.
+    if lower[:5] in ("meal:", "meal "):
+        _handle_meal(sender, dt, ts_ms, meal_pk, arg, simulate=simulate) if arg else _send_sms(sender, "Try: meal: greek yogurt + berries")
+        return
+    handler = _EXACT_CMDS.get(lower)
+    if handler is None:
+        for prefix, fn in _PREFIX_CMDS:
+            if lower.startswith(prefix):
+                handler = fn
+                break
+    if handler is not None:
+        handler(sender, dt, ts_ms, meal_pk, arg, simulate)
+    else:
+        _send_sms(sender,
+            "Unrecognized. Send `meal: ...`, `/lookup: ...`, `/summary`, `/week`, `/month`, `/undo`, `/reset today`, "
+            "`/barcode ...`, `/food ...`, `/migraine ...`, `/med ...`, `/meds`, `/meds today`, `/meds month`, `/fact`, `/facts ...`, "
+            "`/fast ...`, or `/help`")
+
 def lambda_handler(event, context):
-    for rec in event.get("Records", []):
-        msg = json.loads(rec["Sns"]["Message"])
-        raw_text = (msg.get("text") or msg.get("body") or "").strip()
-        sender = msg.get("sender") or msg.get("from") or ""
-        meal_pk = msg.get("pk") or USER_ID
-
-        simulate = False
-        if raw_text.lower().startswith("/test "):
-            simulate = True
-            raw_text = raw_text[6:].strip()
-
-        ts_ms = _parse_ts(msg.get("sk"))
-        dt = _today_est_from_ts(ts_ms)  # EST day boundary
-
-        lower = raw_text.lower()
-        if lower in ("/help", "help"):
-            _handle_help(sender)
-        elif lower.startswith("/summary"):
-            _handle_summary(sender, dt)
-        elif lower.startswith("/barcode"):
-            _handle_barcode(sender, raw_text.split(" ", 1)[1] if " " in raw_text else "")
-        elif lower.startswith("/food"):
-            _handle_food(sender, raw_text.split(" ", 1)[1] if " " in raw_text else "")
-        elif lower == "/week":
-            _handle_week(sender)
-        elif lower == "/month":
-            _handle_month(sender)
-        elif lower.startswith("/lookup:") or lower.startswith("/lookup "):
-            q = raw_text.split(":", 1)[1].strip() if ":" in raw_text else raw_text.split(" ", 1)[1].strip()
-            _handle_lookup(sender, dt, q) if q else _send_sms(sender, "Usage: /lookup: <meal>")
-        elif lower == "/undo":
-            _handle_undo(sender, dt, simulate=simulate)
-        elif lower == "/reset today":
-            _handle_reset_today(sender, dt, simulate=simulate)
-        elif lower == "/meds":
-            _handle_meds(sender)
-        elif lower == "/meds today":
-            _handle_meds_today(sender)
-        elif lower == "/meds month":
-            _handle_meds_month(sender)
-        elif lower.startswith("/migraine"):
-            _handle_migraine(sender, raw_text.split(" ", 1)[1] if " " in raw_text else "", simulate=simulate)
-        elif lower.startswith("/med"):
-            _handle_med(sender, raw_text.split(" ", 1)[1] if " " in raw_text else "", simulate=simulate)
-        elif lower.startswith("/facts"):
-            tail = raw_text.split(" ", 1)[1] if " " in raw_text else ""
-            _handle_facts(sender, tail, simulate=simulate)
-        elif lower.startswith("/fact"):
-            if ":" in raw_text:
-                tail = raw_text.split(":", 1)[1].strip()
-            else:
-                tail = raw_text.split(" ", 1)[1].strip() if " " in raw_text else ""
-            _handle_fact(sender, tail, simulate=simulate)
-        elif lower.startswith("/fast"):
-            _handle_fast(sender, raw_text.split(" ", 1)[1] if " " in raw_text else "", simulate=simulate)
-        elif lower.startswith("meal:") or lower.startswith("meal "):
-            meal_text = raw_text.split(":", 1)[1].strip() if ":" in raw_text else raw_text.split(" ", 1)[1].strip()
-            _handle_meal(sender, dt, ts_ms, meal_pk, meal_text, simulate=simulate) if meal_text else _send_sms(sender, "Try: meal: greek yogurt + berries")
-        else:
-            _send_sms(sender,
-                "Unrecognized. Send `meal: ...`, `/lookup: ...`, `/summary`, `/week`, `/month`, `/undo`, `/reset today`, "
-                "`/barcode ...`, `/food ...`, `/migraine ...`, `/med ...`, `/meds`, `/meds today`, `/meds month`, `/fact`, `/facts ...`, "
-                "`/fast ...`, or `/help`")
+    _INV_CACHE.clear()
+    _EVENT_BUF.clear()
+    records = event.get("Records", [])
+    if len(records) <= 1:
+        for rec in records:
+            _process_record(rec)
+        _flush_events()
+        return {"ok": True}
+    # Multi-record deliveries are rare; give them their own small pool so
+    # record threads never contend with the nested I/O submitted to
+    # _POOL by individual handlers. Records with identical payloads run
+    # serially within one group, so a duplicated meal text hits the
+    # Nutritionix memo instead of racing it with a second API call.
+    groups: dict[str, list] = {}
+    for rec in records:
+        groups.setdefault(rec["Sns"]["Message"], []).append(rec)
+
+    def _run_group(group):
+        for rec in group:
+            _process_record(rec)
+
+    with ThreadPoolExecutor(max_workers=min(len(groups), 4)) as ex:
+        list(ex.map(_run_group, groups.values()))
+    _flush_events()
     return {"ok": True}
+
+# Prefetch both API secrets while the container is still initializing so
+# the first message doesn't pay the Secrets Manager round trips. Any
+# failure here falls back to the lazy fetch on first use.
+try:
+    _nx_headers()
+    _twilio_cfg()
+except Exception:
+    log.warning("secret prefetch failed; will fetch lazily", exc_info=True)
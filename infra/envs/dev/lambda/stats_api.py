@@ -1,9 +1,22 @@
 # file: infra/envs/dev/lambda/stats_api.py
-import os, json
+import os, json, time
+import base64, gzip
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import lru_cache, wraps
+from itertools import chain
 from datetime import datetime, timedelta, date
 from zoneinfo import ZoneInfo
 import boto3
 from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+
+# Optional fast JSON serializer; stdlib json is the fallback so the
+# function runs unchanged without the extra package.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 TZ = ZoneInfo("America/New_York")
 
@@ -16,55 +29,166 @@ MEDS_TABLE   = os.environ["MEDS_TABLE"]
 CALORIES_MAX = int(os.environ.get("CALORIES_MAX", "1800"))
 PROTEIN_MIN  = int(os.environ.get("PROTEIN_MIN",  "190"))
 
-ddb        = boto3.resource("dynamodb")
+# Shared executor so independent DynamoDB reads can overlap; boto3
+# clients are thread-safe and the pool survives across warm invocations.
+_POOL = ThreadPoolExecutor(max_workers=8)
+
+# The resource, table handles and thread pool above are module-level on
+# purpose: Lambda reuses the module across warm invocations, so they
+# must be created exactly once and be safe to share between the pool's
+# threads. Nothing below may construct a new boto3 session per request.
+# Keep-alive avoids a TCP+TLS handshake per query on warm containers;
+# adaptive retries back off instead of hammering a throttled table.
+ddb        = boto3.resource("dynamodb", config=Config(
+    tcp_keepalive=True,
+    max_pool_connections=20,
+    retries={"mode": "adaptive"},
+))
 meals_tbl  = ddb.Table(MEALS_TABLE)
 totals_tbl = ddb.Table(TOTALS_TABLE)
 migs_tbl   = ddb.Table(MIGS_TABLE)
 meds_tbl   = ddb.Table(MEDS_TABLE)
 
+# Optional connection warm-up: one tiny query during init moves the TLS
+# handshake and credential resolution out of the first request. Opt-in
+# via WARM_DDB=1 so local imports and tests stay offline.
+if os.environ.get("WARM_DDB") == "1":
+    try:
+        meals_tbl.query(
+            KeyConditionExpression=Key("pk").eq(USER_ID),
+            Limit=1,
+        )
+    except Exception:
+        pass
+
 def _today() -> date:
     return datetime.now(TZ).date()
 
+@lru_cache(maxsize=8)
 def _start_of_week(d: date) -> date:
     return d - timedelta(days=d.weekday())
 
+@lru_cache(maxsize=8)
 def _start_of_month(d: date) -> date:
     return d.replace(day=1)
 
+# The response headers never vary; build the dict once.
+_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET,OPTIONS",
+    "Access-Control-Allow-Headers": "*",
+}
+
+def _json_default(o):
+    # DynamoDB numerics come back as Decimal; emit real JSON numbers
+    # instead of strings, and dates as ISO strings.
+    if isinstance(o, Decimal):
+        return int(o) if o == o.to_integral_value() else float(o)
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    return str(o)
+
+# Set per request from the Accept-Encoding header; the handler runs one
+# request per invocation so a module flag is safe.
+_GZIP_OK = False
+
 def _resp(o, code=200):
-    return {
-        "statusCode": code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
-            "Access-Control-Allow-Headers": "*",
-        },
-        "body": json.dumps(o, default=str),
-    }
+    if orjson is not None:
+        body = orjson.dumps(o, default=_json_default).decode()
+    else:
+        body = json.dumps(o, default=_json_default)
+    # /stats/health bodies run tens of KB of highly compressible JSON;
+    # level 1 keeps the CPU cost negligible. Small bodies skip the
+    # base64 overhead.
+    if _GZIP_OK and len(body) > 1024:
+        gz = gzip.compress(body.encode(), compresslevel=1)
+        return {
+            "statusCode": code,
+            "headers": {**_HEADERS, "Content-Encoding": "gzip"},
+            "body": base64.b64encode(gz).decode(),
+            "isBase64Encoded": True,
+        }
+    return {"statusCode": code, "headers": _HEADERS, "body": body}
+
+# Partition-key conditions never change for a deployment; build them
+# once instead of per query.
+_TOTALS_PK_COND = Key("pk").eq(f"total#{USER_ID}")
+_USER_PK_COND   = Key("pk").eq(USER_ID)
+
+# In-process cache for the route builders. Keys carry today's date so a
+# day rollover naturally misses, and the short TTL keeps intraday
+# numbers fresh (today's totals change every time a meal is logged)
+# while repeated dashboard polls are served from memory.
+_CACHE: dict[tuple, tuple[float, object]] = {}
+_CACHE_TTL = 60.0
+
+def _ttl_cache(fn):
+    @wraps(fn)
+    def wrapper(*args):
+        key = (fn.__name__, _today().isoformat(), *map(str, args))
+        now = time.monotonic()
+        hit = _CACHE.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+        val = fn(*args)
+        _CACHE[key] = (now + _CACHE_TTL, val)
+        return val
+    return wrapper
 
 # ----- Dynamo helpers -----
+def _query_pages(tbl, **kwargs):
+    """Yield each page of a table query, following LastEvaluatedKey.
+
+    Mirrors the enricher's pager: the resource-layer Key() conditions
+    rule out the client paginators, so the loop lives here once."""
+    resp = tbl.query(**kwargs)
+    yield resp
+    while "LastEvaluatedKey" in resp:
+        resp = tbl.query(**kwargs, ExclusiveStartKey=resp["LastEvaluatedKey"])
+        yield resp
+
 def _get_totals_range(d0: date, d1: date):
     """Return list of totals rows between d0..d1 inclusive."""
     resp = totals_tbl.query(
-        KeyConditionExpression=Key("pk").eq(f"total#{USER_ID}") &
-                               Key("sk").between(d0.isoformat(), d1.isoformat())
+        KeyConditionExpression=_TOTALS_PK_COND &
+                               Key("sk").between(d0.isoformat(), d1.isoformat()),
+        ProjectionExpression="sk, calories, #p, carbs, fat, last_update_ms",
+        ExpressionAttributeNames={"#p": "protein"},
     )
     return resp.get("Items", [])
 
 def _sum_rows(rows):
+    # Bind int locally; the global lookup per field adds up over a
+    # month of Decimal-valued rows.
+    _int = int
     cal = pro = carb = fat = 0
     for it in rows:
-        cal += int(it.get("calories", 0))
-        pro += int(it.get("protein", 0))
-        carb += int(it.get("carbs", 0))
-        fat += int(it.get("fat", 0))
+        get = it.get
+        cal += _int(get("calories", 0))
+        pro += _int(get("protein", 0))
+        carb += _int(get("carbs", 0))
+        fat += _int(get("fat", 0))
     return {"cal": cal, "pro": pro, "carb": carb, "fat": fat}
 
-def _get_meals_for_day(d: date):
+def _count(tbl, key_cond) -> int:
+    """Count matching items without pulling them across the wire."""
+    resp = tbl.query(KeyConditionExpression=key_cond, Select="COUNT")
+    total = resp.get("Count", 0)
+    while "LastEvaluatedKey" in resp:
+        resp = tbl.query(KeyConditionExpression=key_cond, Select="COUNT",
+                         ExclusiveStartKey=resp["LastEvaluatedKey"])
+        total += resp.get("Count", 0)
+    return total
+
+def _get_meals_for_day(d: date, count_only: bool = False):
     pfx = f"{d.isoformat()}#"
+    key_cond = _USER_PK_COND & Key("sk").begins_with(pfx)
+    if count_only:
+        return _count(meals_tbl, key_cond)
     resp = meals_tbl.query(
-        KeyConditionExpression=Key("pk").eq(USER_ID) & Key("sk").begins_with(pfx)
+        KeyConditionExpression=key_cond,
+        ProjectionExpression="raw_text, kcal, protein_g, carbs_g, fat_g, created_ms",
     )
     items = []
     for it in resp.get("Items", []):
@@ -78,30 +202,42 @@ def _get_meals_for_day(d: date):
         })
     return items
 
-def _loop_days_gsi_dt(tbl, d0: date, d1: date):
-    """Yield all items for dt in [d0..d1] using IndexName='gsi_dt' (hash = dt)."""
+def _query_one_day(tbl, day: str, **extra):
+    """All items for one dt partition on IndexName='gsi_dt' (hash = dt)."""
+    items = []
+    for page in _query_pages(tbl, IndexName="gsi_dt",
+                             KeyConditionExpression=Key("dt").eq(day), **extra):
+        items.extend(page.get("Items", []))
+    return items
+
+def _loop_days_gsi_dt(tbl, d0: date, d1: date, **extra):
+    """Yield all items for dt in [d0..d1]; each day partition is
+    independent, so the day queries run concurrently on the pool.
+    Extra kwargs (e.g. ProjectionExpression) pass through to the query."""
+    days = []
     cur = d0
     while cur <= d1:
-        last = None
-        while True:
-            kwargs = {
-                "IndexName": "gsi_dt",
-                "KeyConditionExpression": Key("dt").eq(cur.isoformat()),
-            }
-            if last:
-                kwargs["ExclusiveStartKey"] = last
-            q = tbl.query(**kwargs)
-            for it in q.get("Items", []):
-                yield it
-            last = q.get("LastEvaluatedKey")
-            if not last:
-                break
+        days.append(cur.isoformat())
         cur += timedelta(days=1)
+    return chain.from_iterable(_POOL.map(lambda day: _query_one_day(tbl, day, **extra), days))
 
+@_ttl_cache
 def _get_meds_month(d: date):
+    # Med sort keys are "{dt}#{ts_ms}", so the month is one base-table
+    # range query; migraines keep the per-day gsi_dt loop because their
+    # sk is "migraine#{id}" with no date ordering.
     d0, d1 = _start_of_month(d), d
     out = []
-    for it in _loop_days_gsi_dt(meds_tbl, d0, d1):
+    items: list = []
+    for page in _query_pages(
+        meds_tbl,
+        KeyConditionExpression=_USER_PK_COND &
+                               Key("sk").between(f"{d0.isoformat()}#", f"{d1.isoformat()}#\uffff"),
+        ProjectionExpression="dt, ts_ms, category, dose, #t",
+        ExpressionAttributeNames={"#t": "text"},
+    ):
+        items.extend(page.get("Items", []))
+    for it in items:
         out.append({
             "dt"     : it.get("dt"),
             "ts_ms"  : int(it.get("ts_ms", 0)),
@@ -111,10 +247,14 @@ def _get_meds_month(d: date):
         })
     return out
 
+@_ttl_cache
 def _get_migraines_month(d: date):
     d0, d1 = _start_of_month(d), d
     out = []
-    for it in _loop_days_gsi_dt(migs_tbl, d0, d1):
+    for it in _loop_days_gsi_dt(
+        migs_tbl, d0, d1,
+        ProjectionExpression="dt, episode_id, category, start_ms, end_ms, is_open, notes",
+    ):
         out.append({
             "dt": it.get("dt"),
             "episode_id": it.get("episode_id"),
@@ -127,8 +267,13 @@ def _get_migraines_month(d: date):
     return out
 
 # ----- Route handlers -----
-def _today_stats():
-    d = _today()
+@_ttl_cache
+def _today_stats(d: date | None = None):
+    if d is None:
+        d = _today()
+    # The totals row and the meal list live in different tables; overlap
+    # the two reads instead of paying both round trips back to back.
+    meals_f = _POOL.submit(_get_meals_for_day, d)
     rows = _get_totals_range(d, d)
     sums = _sum_rows(rows)
     return {
@@ -138,69 +283,105 @@ def _today_stats():
         "carbs":    sums["carb"],
         "fat":      sums["fat"],
         "goals": {"calories_max": CALORIES_MAX, "protein_min": PROTEIN_MIN},
-        "meals": _get_meals_for_day(d),
+        "meals": meals_f.result(),
     }
 
-def _week_stats():
-    d1 = _today()
-    d0 = d1 - timedelta(days=6)
-    rows = _get_totals_range(d0, d1)
-    sums = _sum_rows(rows)
-    days = (d1 - d0).days + 1
-    return {
-        "start": d0.isoformat(), "end": d1.isoformat(),
-        "sum":  sums,
-        "avg":  {"cal": round(sums["cal"]/days,1), "pro": round(sums["pro"]/days,1),
-                 "carb": round(sums["carb"]/days,1), "fat": round(sums["fat"]/days,1)},
-        "goals": {"calories_max": CALORIES_MAX, "protein_min": PROTEIN_MIN},
-    }
+# Version guard beneath the TTL cache: when the TTL lapses but the
+# totals rows haven't changed (count + newest last_update_ms), the
+# previous payload is reused without re-aggregating.
+_VERSION_CACHE: dict[str, tuple[tuple, dict]] = {}
+
+def _totals_version(d0: date, d1: date, rows) -> tuple:
+    # The window bounds are part of the version: after a midnight
+    # rollover the row set can be identical (dropped day had no totals,
+    # nothing written yet today) while start/end have shifted.
+    return (d0, d1, len(rows), max((int(r.get("last_update_ms", 0)) for r in rows), default=0))
 
-def _month_stats():
-    d1 = _today()
-    d0 = _start_of_month(d1)
+def _range_stats(d0: date, d1: date, include_meals: bool = False, version_key: str | None = None):
+    """Shared builder for the windowed totals routes."""
+    meals_f = _POOL.submit(_get_meals_for_day, d1) if include_meals else None
     rows = _get_totals_range(d0, d1)
+    if version_key:
+        version = _totals_version(d0, d1, rows)
+        cached = _VERSION_CACHE.get(version_key)
+        if cached and cached[0] == version:
+            if meals_f:
+                meals_f.result()
+            return cached[1]
     sums = _sum_rows(rows)
     days = (d1 - d0).days + 1
-    return {
+    result = {
         "start": d0.isoformat(), "end": d1.isoformat(),
         "sum":  sums,
         "avg":  {"cal": round(sums["cal"]/days,1), "pro": round(sums["pro"]/days,1),
                  "carb": round(sums["carb"]/days,1), "fat": round(sums["fat"]/days,1)},
         "goals": {"calories_max": CALORIES_MAX, "protein_min": PROTEIN_MIN},
     }
+    if meals_f:
+        result["meals"] = meals_f.result()
+    if version_key:
+        _VERSION_CACHE[version_key] = (version, result)
+    return result
+
+@_ttl_cache
+def _week_stats(d1: date | None = None):
+    if d1 is None:
+        d1 = _today()
+    return _range_stats(d1 - timedelta(days=6), d1, version_key="week")
+
+@_ttl_cache
+def _month_stats(d1: date | None = None):
+    if d1 is None:
+        d1 = _today()
+    return _range_stats(_start_of_month(d1), d1, version_key="month")
 
 # ----- Lambda entrypoint -----
+def _route_meals(qs):
+    # optional ?date=YYYY-MM-DD, default today
+    try:
+        d = date.fromisoformat((qs.get("date") or _today().isoformat()))
+    except Exception:
+        return _resp({"error":"bad date"}, 400)
+    return _resp({"date": d.isoformat(), "meals": _get_meals_for_day(d)})
+
+def _route_health(qs):
+    # one call that returns everything useful for a dashboard; the
+    # five sections read disjoint data, so build them concurrently.
+    # Resolve today's date once and thread it through rather than
+    # re-deriving it (zoneinfo lookup and all) in every section.
+    d = _today()
+    futures = {
+        "today": _POOL.submit(_today_stats, d),
+        "week":  _POOL.submit(_week_stats, d),
+        "month": _POOL.submit(_month_stats, d),
+        "meds_month": _POOL.submit(_get_meds_month, d),
+        "migraines_month": _POOL.submit(_get_migraines_month, d),
+    }
+    return _resp({k: f.result() for k, f in futures.items()})
+
+# Routes keyed by the last one or two path segments, so stage prefixes
+# ("/dev/stats/today") resolve with a dict probe instead of a chain of
+# endswith checks.
+_ROUTES = {
+    "stats/today":      lambda qs: _resp(_today_stats()),
+    "stats/week":       lambda qs: _resp(_week_stats()),
+    "stats/month":      lambda qs: _resp(_month_stats()),
+    "stats/meals":      _route_meals,
+    "meds/month":       lambda qs: _resp({"items": _get_meds_month(_today())}),
+    "migraines/month":  lambda qs: _resp({"items": _get_migraines_month(_today())}),
+    "stats/health":     _route_health,
+}
+
 def lambda_handler(event, context):
-    # Simple router on path
+    global _GZIP_OK
+    headers = {(k or "").lower(): v for k, v in (event.get("headers") or {}).items()}
+    _GZIP_OK = "gzip" in (headers.get("accept-encoding") or "").lower()
     path = (event.get("rawPath") or event.get("path") or "/").lower()
     qs   = event.get("queryStringParameters") or {}
-    if path.endswith("/stats/today"):
-        return _resp(_today_stats())
-    if path.endswith("/stats/week"):
-        return _resp(_week_stats())
-    if path.endswith("/stats/month"):
-        return _resp(_month_stats())
-    if path.endswith("/stats/meals"):
-        # optional ?date=YYYY-MM-DD, default today
-        try:
-            d = date.fromisoformat((qs.get("date") or _today().isoformat()))
-        except Exception:
-            return _resp({"error":"bad date"}, 400)
-        return _resp({"date": d.isoformat(), "meals": _get_meals_for_day(d)})
-    if path.endswith("/stats/meds/month"):
-        return _resp({"items": _get_meds_month(_today())})
-    if path.endswith("/stats/migraines/month"):
-        return _resp({"items": _get_migraines_month(_today())})
-    if path.endswith("/stats/health"):
-        # one call that returns everything useful for a dashboard
-        d = _today()
-        return _resp({
-            "today": _today_stats(),
-            "week":  _week_stats(),
-            "month": _month_stats(),
-            "meds_month": _get_meds_month(d),
-            "migraines_month": _get_migraines_month(d),
-        })
+    segs = [p for p in path.split("/") if p]
+    handler = _ROUTES.get("/".join(segs[-2:])) if segs else None
+    if handler is not None:
+        return handler(qs)
 
     # CORS preflight / unknown
     if event.get("requestContext", {}).get("http", {}).get("method") == "OPTIONS":
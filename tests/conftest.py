@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import sys
-import uuid
 from importlib import util
 from pathlib import Path
 
@@ -45,9 +44,14 @@ class _StubDynamoResource:
         return _StubDynamoTable()
 
 
-@pytest.fixture
-def meal_enricher(monkeypatch):
-    """Load the meal_enricher module with AWS clients stubbed."""
+@pytest.fixture(scope="session")
+def _meal_enricher_module():
+    """Load meal_enricher once per session with AWS clients stubbed.
+
+    exec_module on a file this size dominates test time, so the load is
+    session-scoped; the function-scoped fixture below resets the
+    per-invocation state between tests.
+    """
 
     env = {
         "MEALS_TABLE": "meals_test",
@@ -62,14 +66,15 @@ def meal_enricher(monkeypatch):
         "TWILIO_SECRET_NAME": "twilio_secret_test",
         "USER_ID": "unit-test-user",
     }
+    mp = pytest.MonkeyPatch()
     for key, value in env.items():
-        monkeypatch.setenv(key, value)
+        mp.setenv(key, value)
 
     secrets_stub = _StubSecretsClient()
-    monkeypatch.setattr(boto3, "client", lambda service: secrets_stub if service == "secretsmanager" else object())
-    monkeypatch.setattr(boto3, "resource", lambda service: _StubDynamoResource() if service == "dynamodb" else object())
+    mp.setattr(boto3, "client", lambda service, **kwargs: secrets_stub if service == "secretsmanager" else object())
+    mp.setattr(boto3, "resource", lambda service, **kwargs: _StubDynamoResource() if service == "dynamodb" else object())
 
-    module_name = f"meal_enricher_{uuid.uuid4().hex}"
+    module_name = "meal_enricher_under_test"
     module_path = REPO_ROOT / "infra/envs/dev/lambda/meal_enricher.py"
     spec = util.spec_from_file_location(module_name, module_path)
     module = util.module_from_spec(spec)
@@ -80,3 +85,62 @@ def meal_enricher(monkeypatch):
     yield module
 
     sys.modules.pop(module_name, None)
+    mp.undo()
+
+
+@pytest.fixture(scope="session")
+def _stats_api_module():
+    """Load stats_api once per session with the DynamoDB stub."""
+
+    env = {
+        "MEALS_TABLE": "meals_test",
+        "TOTALS_TABLE": "totals_test",
+        "MIGRAINES_TABLE": "migraines_test",
+        "MEDS_TABLE": "meds_test",
+        "USER_ID": "unit-test-user",
+    }
+    mp = pytest.MonkeyPatch()
+    for key, value in env.items():
+        mp.setenv(key, value)
+    mp.setattr(boto3, "resource", lambda service, **kwargs: _StubDynamoResource() if service == "dynamodb" else object())
+
+    module_name = "stats_api_under_test"
+    module_path = REPO_ROOT / "infra/envs/dev/lambda/stats_api.py"
+    spec = util.spec_from_file_location(module_name, module_path)
+    module = util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+
+    yield module
+
+    sys.modules.pop(module_name, None)
+    mp.undo()
+
+
+@pytest.fixture
+def stats_api(_stats_api_module):
+    """Shared stats_api module with its response caches cleared."""
+
+    module = _stats_api_module
+    module._CACHE.clear()
+    module._VERSION_CACHE.clear()
+    return module
+
+
+@pytest.fixture
+def meal_enricher(_meal_enricher_module):
+    """Shared module instance with per-invocation state cleared.
+
+    The session scope only amortizes exec_module; every mutable
+    container-level cache is reset here so no test leaks overrides,
+    Nutritionix results or facts into the next one.
+    """
+
+    module = _meal_enricher_module
+    module._INV_CACHE.clear()
+    module._EVENT_BUF.clear()
+    module._NX_CACHE.clear()
+    module._ALIAS_CACHE = None
+    module._FACTS_CACHE = None
+    return module
@@ -83,3 +83,23 @@ def test_parse_when_to_ms_iso_datetime(meal_enricher):
     tokens = ["2024-02-20", "08:30"]
     ts_ms = meal_enricher._parse_when_to_ms(tokens)
     assert ts_ms == int(target.timestamp() * 1000)
+
+def test_fmt_est_formats_timestamp(meal_enricher):
+    target = datetime(2024, 2, 20, 8, 30, tzinfo=ZoneInfo("America/New_York"))
+    assert meal_enricher._fmt_est(int(target.timestamp() * 1000)) == "8:30 AM EST"
+
+
+def test_handle_med_simulate_formats_time(meal_enricher, monkeypatch):
+    messages: list[str] = []
+    monkeypatch.setattr(meal_enricher, "_send_sms", lambda sender, body: messages.append(body))
+
+    meal_enricher._handle_med("+15555551212", "sumatriptan 100mg", simulate=True)
+
+    assert messages and "Would log med: sumatriptan 100mg at " in messages[-1]
+
+def test_match_override_requires_full_segment(meal_enricher, monkeypatch):
+    monkeypatch.setattr(meal_enricher, "_alias_load", lambda: {"rice": {"sk": "rice", "kcal": 200}})
+
+    assert meal_enricher._match_override_in_text("chicken rice bowl") == (None, 0)
+    assert meal_enricher._match_override_in_text("chicken + rice") == ("rice", 1)
+    assert meal_enricher._match_override_in_text("rice") == ("rice", 1)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import json
+
+
+def test_stats_today_route(stats_api):
+    resp = stats_api.lambda_handler({"rawPath": "/stats/today"}, None)
+    assert resp["statusCode"] == 200
+    body = json.loads(resp["body"])
+    assert body["calories"] == 0
+    assert body["meals"] == []
+
+
+def test_stats_health_route(stats_api):
+    resp = stats_api.lambda_handler({"rawPath": "/dev/stats/health"}, None)
+    assert resp["statusCode"] == 200
+    body = json.loads(resp["body"])
+    assert set(body) == {"today", "week", "month", "meds_month", "migraines_month"}
+
+
+def test_unknown_path_lists_routes(stats_api):
+    resp = stats_api.lambda_handler({"rawPath": "/nope"}, None)
+    body = json.loads(resp["body"])
+    assert "/stats/today" in body["paths"]